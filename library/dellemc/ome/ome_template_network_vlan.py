@@ -45,16 +45,17 @@ options:
   template_name:
     description:
       - Name of the template.
-      - It is mutually exclusive with I(template_id)
+      - It is mutually exclusive with I(template_id) and I(templates)
     type: str
   template_id:
     description:
       - Id of the template.
-      - It is mutually exclusive with I(template_name)
+      - It is mutually exclusive with I(template_name) and I(templates)
     type: int
   nic_identifier:
-    description: Display name of NIC port in the template for vLAN configuration.
-    required: true
+    description:
+      - Display name of NIC port in the template for vLAN configuration.
+      - Required when I(template_id) or I(template_name) is provided.
     type: str
   untagged_networks:
     description: List of untagged networks and their corresponding NIC ports
@@ -102,8 +103,85 @@ options:
           - List of I(tagged_network_names) is combined with list of I(tagged_network_ids) when adding tagged vLANs to a port.
         type: list
         elements: str
+  force:
+    description:
+      - Apply the vLAN settings even when the template already has them.
+      - By default the module reports no changes when the requested vLANs match the template.
+    type: bool
+    default: false
+  templates:
+    description:
+      - List of templates and NICs to be configured in a single task.
+      - Networks are fetched once and the templates are read and updated over the same session.
+      - Settings of several NICs of a template are applied to it in a single update.
+      - A I(nic_identifier) can be given only once for a template.
+      - This option is mutually exclusive with I(template_id), I(template_name), I(nic_identifier),
+        I(untagged_networks) and I(tagged_networks)
+    type: list
+    elements: dict
+    suboptions:
+      template_id:
+        description:
+          - Id of the template.
+          - It is mutually exclusive with I(template_name)
+        type: int
+      template_name:
+        description:
+          - Name of the template.
+          - It is mutually exclusive with I(template_id)
+        type: str
+      nic_identifier:
+        description: Display name of NIC port in the template for vLAN configuration.
+        required: true
+        type: str
+      untagged_networks:
+        description: List of untagged networks and their corresponding NIC ports.
+        type: list
+        elements: dict
+        suboptions:
+          port:
+            description: NIC port number of the untagged vLAN.
+            required: true
+            type: int
+          untagged_network_id:
+            description:
+              - ID of the untagged vLAN
+              - Enter 0 to clear the untagged vLAN from the port.
+              - This option is mutually exclusive with I(untagged_network_name)
+            type: int
+          untagged_network_name:
+            description:
+              - name of the vlan for untagging
+              - provide 0 for clearing the untagging for this I(port)
+              - This parameter is mutually exclusive with I(untagged_network_id)
+            type: str
+      tagged_networks:
+        description: List of tagged vLANs and their corresponding NIC ports.
+        type: list
+        elements: dict
+        suboptions:
+          port:
+            description: NIC port number of the tagged vLAN
+            required: true
+            type: int
+          tagged_network_ids:
+            description:
+              - List of IDs of the tagged vLANs
+              - Enter [] to remove the tagged vLAN from a port.
+            type: list
+            elements: int
+          tagged_network_names:
+            description:
+              - List of names of tagged vLANs
+              - Enter [] to remove the tagged VLAN from a port.
+            type: list
+            elements: str
 requirements:
     - "python >= 2.7.5"
+    - "ijson with the yajl2_c backend (optional, lowers memory use when parsing a large list of networks)"
+notes:
+    - The network name to ID map and the vLAN settings of each template are cached per I(hostname), I(port) and I(username)
+      in C(~/.ansible/tmp) along with their ETag, subsequent runs read them again only when OME reports a change.
 author:
     - "Jagadeesh N V(@jagadeeshnv)"
 '''
@@ -160,6 +238,24 @@ EXAMPLES = r'''
         tagged_network_names: []
       - port: 2
         tagged_network_names: []
+
+- name: Add vLANs to multiple templates in a single task.
+  ome_template_network_vlan:
+    hostname: "192.168.0.1"
+    username: "username"
+    password: "password"
+    templates:
+      - template_id: 78
+        nic_identifier: NIC Slot 4
+        untagged_networks:
+          - port: 1
+            untagged_network_id: 127656
+      - template_name: template2
+        nic_identifier: NIC Slot 1
+        tagged_networks:
+          - port: 2
+            tagged_network_names:
+              - vlan4
 '''
 
 RETURN = r'''
@@ -169,8 +265,21 @@ msg:
   description: Overall status of the template vlan operation.
   returned: always
   sample: "Successfully applied the network settings to template"
+applied_template_ids:
+  description: Ids of the templates updated by the task.
+  returned: when I(templates) is given and the network settings are applied to at least one template
+  type: list
+  sample: [78, 79]
+failed_template_ids:
+  description: Ids of the templates that could not be updated, other templates of the task may be updated already.
+  returned: when I(templates) is given and applying the network settings fails for a template
+  type: list
+  sample: [79]
 error_info:
-  description: Details of the HTTP Error.
+  description:
+    - Details of the HTTP Error.
+    - When I(templates) is given and applying the network settings fails, the details of the error for each id
+      in I(failed_template_ids).
   returned: on HTTP error
   type: dict
   sample: {
@@ -198,11 +307,25 @@ error_info:
 '''
 
 import json
+import os
+import tempfile
+from collections import Counter, OrderedDict
+from io import BytesIO
 from ssl import SSLError
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.remote_management.dellemc.ome import RestOME
 from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
 from ansible.module_utils.six.moves.urllib.error import URLError, HTTPError
+try:
+    from concurrent.futures import ThreadPoolExecutor
+    HAS_FUTURES = True
+except ImportError:
+    HAS_FUTURES = False
+try:
+    from ijson.backends import yajl2_c as ijson  # pure python backends parse slower than json.loads
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
 
 NETWORK_HIERARCHY_VIEW = 4  # For Network hierarchy View in a Template
 UPDATE_NETWORK_CONFIG = "TemplateService/Actions/TemplateService.UpdateNetworkConfig"
@@ -210,94 +333,339 @@ TEMPLATE_ATTRIBUTE_VIEW = "TemplateService/Templates({0})/Views({1}" \
                           ")/AttributeViewDetails"
 VLAN_NETWORKS = "NetworkConfigurationService/Networks?$top=9999"
 TEMPLATE_VIEW = "TemplateService/Templates"
+TEMPLATE_SPEC_KEYS = ("template_id", "template_name", "nic_identifier", "untagged_networks", "tagged_networks")
+MAX_WORKERS = 8
+VLAN_CACHE_DIR = "~/.ansible/tmp"
 
 KEY_ATTR_NAME = 'DisplayName'
 SUB_GRP_ATTR_NAME = 'SubAttributeGroups'
 GRP_ATTR_NAME = 'Attributes'
 GRP_NAME_ID_ATTR_NAME = 'GroupNameId'
 CUSTOM_ID_ATTR_NAME = 'CustomId'
+VLAN_UNTAGGED = "vlan untagged"
+VLAN_TAGGED = "vlan tagged"
+VLAN_ATTR_TYPES = {"Vlan UnTagged": VLAN_UNTAGGED, "Vlan Tagged": VLAN_TAGGED}  # DisplayName as sent by OME
+WHITESPACE_TABLE = {ord(" "): None, ord("\t"): None}
 
 
 def get_item_id(rest_obj, name, uri):
-    resp = rest_obj.invoke_request('GET', uri)
-    if resp.success and resp.json_data.get('value'):
-        tlist = resp.json_data.get('value', [])
+    """Filters the collection by name on OME, falls back to the complete collection
+    if the filter query is rejected with 400, any other error is raised"""
+    query_param = {"$filter": "Name eq '{0}'".format(name.replace("'", "''"))}
+    try:
+        resp = rest_obj.invoke_request('GET', uri, query_param=query_param)
+    except HTTPError as err:
+        if err.code != 400:
+            raise
+        resp = rest_obj.invoke_request('GET', uri)
+    if resp.success:
+        tlist = (resp.json_data or {}).get('value') or []
         for xtype in tlist:
             if xtype.get('Name', "") == name:
                 return xtype.get('Id')
     return 0
 
 
-def get_vlan_name_id_map(rest_obj):
+def stream_vlan_name_id_map(body):
+    """builds the name to id map from the raw Networks response, only Name and Id of each
+    network are decoded into python objects. This lowers the peak memory of large responses,
+    it is not faster than json.loads"""
+    d = {}
+    name = vlan_id = None
+    for prefix, event, value in ijson.parse(BytesIO(body)):
+        if prefix == "value.item.Name":
+            name = value
+        elif prefix == "value.item.Id":
+            vlan_id = value
+        elif prefix == "value.item" and event == "end_map":
+            d[name] = vlan_id
+            name = vlan_id = None
+    return d
+
+
+def get_vlan_name_id_map(resp):
     k = "Name"
     v = "Id"
     d = {}
-    resp = rest_obj.invoke_request('GET', VLAN_NETWORKS)
-    if resp.success and resp.json_data.get('value'):
-        tlist = resp.json_data.get('value', [])
+    if resp.success and HAS_IJSON and isinstance(resp.body, bytes):
+        return stream_vlan_name_id_map(resp.body)
+    if resp.success:
+        tlist = (resp.json_data or {}).get('value') or []
         for xtype in tlist:
             d[xtype[k]] = xtype[v]
     return d
 
 
-def get_template_vlan_info(module, rest_obj, template_id):
+def get_cache_path(params, *keys):
+    """cache file of the OME host, port and user in I(params), further qualified by keys"""
+    name = "_".join(str(key) for key in ("ome_vlan_cache", params["hostname"], params["port"], params["username"]) + keys)
+    return os.path.join(os.path.expanduser(VLAN_CACHE_DIR), name + ".json")
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, data):
+    """writes the cache through a temporary file, so parallel tasks never read a partial cache"""
+    tmp_path = None
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(data, cache_file)
+        os.rename(tmp_path, cache_path)
+    except (IOError, OSError):
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def fetch_vlan_name_id_map(rest_obj, cache_params=None):
+    """fetches the Networks name to id map, revalidating the cached copy of the map with its ETag"""
+    cache_path = get_cache_path(cache_params) if cache_params else None
+    cache = load_cache(cache_path) if cache_path else {}
+    headers = {"If-None-Match": cache["etag"]} if cache.get("etag") else None
+    try:
+        resp = rest_obj.invoke_request('GET', VLAN_NETWORKS, headers=headers)
+    except HTTPError as err:
+        if err.code == 304:
+            return cache["networks"]
+        raise
+    vlan_name_id_map = get_vlan_name_id_map(resp)
+    if cache_path and resp.success:
+        etag = resp.headers.get("ETag")
+        if etag:
+            save_cache(cache_path, {"etag": etag, "networks": vlan_name_id_map})
+    return vlan_name_id_map
+
+
+def get_template_specs(module):
+    """returns the per template vlan settings, either from I(templates) or the top level options"""
+    templates = module.params.get("templates")
+    if templates is not None:
+        return templates
+    return [dict((key, module.params.get(key)) for key in TEMPLATE_SPEC_KEYS)]
+
+
+def get_spec_ports(spec):
+    """ports for which vlans are requested in the template settings"""
+    ports = set(utg["port"] for utg in spec.get("untagged_networks") or [])
+    ports.update(tg["port"] for tg in spec.get("tagged_networks") or [])
+    return ports
+
+
+def get_template_key(spec):
+    """identifies the template of the settings as given by the user, before its id is resolved"""
+    if spec.get("template_id"):
+        return "template_id", spec["template_id"]
+    return "template_name", spec.get("template_name")
+
+
+def group_template_specs(specs):
+    """template settings grouped by template in the given order, so each template is read once"""
+    groups = OrderedDict()
+    for spec in specs:
+        groups.setdefault(get_template_key(spec), []).append(spec)
+    return list(groups.values())
+
+
+def get_template_attribute_view(rest_obj, template_specs, cache_params=None):
+    """resolves the template id and fetches its network AttributeViewDetails for the settings
+    of one template, the response is None when the cached vlan info of all its NICs is still current"""
+    template_id = template_specs[0].get("template_id")
+    if not template_id:
+        template_id = get_item_id(rest_obj, template_specs[0].get("template_name"), TEMPLATE_VIEW)
+    cache = load_cache(get_cache_path(cache_params, "template", template_id)) if cache_params else {}
+    headers = None
+    nics = cache.get("nics", {})
+    if cache.get("etag") and all(spec.get("nic_identifier") in nics and get_spec_ports(spec).issubset(
+            nics[spec.get("nic_identifier")]["ports"]) for spec in template_specs):
+        headers = {"If-None-Match": cache["etag"]}
+    try:
+        resp = rest_obj.invoke_request('GET', TEMPLATE_ATTRIBUTE_VIEW.format(
+            template_id, NETWORK_HIERARCHY_VIEW), headers=headers)
+    except HTTPError as err:
+        if err.code == 304:
+            return template_id, None, cache
+        raise
+    return template_id, resp, cache
+
+
+def get_template_vlan_maps(module, spec, template_view, cache_params=None):
+    """returns port_id_map, port_untagged_map and port_tagged_map of the NIC from the cache when
+    the template is unchanged, else parses the response and caches the maps against its ETag"""
+    template_id, resp, cache = template_view
+    nic_id = spec.get("nic_identifier")
+    if resp is None:
+        return tuple(dict(pairs) for pairs in cache["nics"][nic_id]["maps"])
+    wanted_ports = get_spec_ports(spec)
+    vlan_maps = get_template_vlan_info(module, resp, template_id, nic_id, wanted_ports)
+    etag = resp.headers.get("ETag") if cache_params and resp.success else None
+    if etag:
+        cache_path = get_cache_path(cache_params, "template", template_id)
+        cache = load_cache(cache_path)  # other NICs of the template may be saved after the view was fetched
+        nics = cache.get("nics", {}) if cache.get("etag") == etag else {}
+        nics[nic_id] = {"ports": sorted(wanted_ports),
+                        "maps": [list(port_map.items()) for port_map in vlan_maps]}  # json keys are str, keep int ports
+        save_cache(cache_path, {"etag": etag, "nics": nics})
+    return vlan_maps
+
+
+def needs_vlan_names(specs):
+    """Networks are needed only to resolve vlan names, "0" clears the untagged vlan without a lookup"""
+    for spec in specs:
+        if any(utg.get("untagged_network_name") not in (None, "", "0") for utg in spec.get("untagged_networks") or []):
+            return True
+        if any(tg.get("tagged_network_names") for tg in spec.get("tagged_networks") or []):
+            return True
+    return False
+
+
+def fetch_template_and_vlans(rest_obj, template_groups, cache_params=None):
+    """Networks and template AttributeViewDetails GETs are independent, so issue them concurrently
+    when concurrent.futures is available, else one after the other.
+    The vlan name map is None when only vlan ids are given."""
+    fetch_names = needs_vlan_names(spec for template_specs in template_groups for spec in template_specs)
+    vlan_name_id_map = None
+    if HAS_FUTURES:
+        with ThreadPoolExecutor(max_workers=min(len(template_groups) + 1, MAX_WORKERS)) as executor:
+            vlan_future = executor.submit(fetch_vlan_name_id_map, rest_obj, cache_params) if fetch_names else None
+            template_futures = [executor.submit(get_template_attribute_view, rest_obj, template_specs, cache_params)
+                                for template_specs in template_groups]
+            if vlan_future:
+                vlan_name_id_map = vlan_future.result()
+            template_views = [future.result() for future in template_futures]
+    else:
+        if fetch_names:
+            vlan_name_id_map = fetch_vlan_name_id_map(rest_obj, cache_params)
+        template_views = [get_template_attribute_view(rest_obj, template_specs, cache_params)
+                          for template_specs in template_groups]
+    return vlan_name_id_map, template_views
+
+
+def merge_vlan_payloads(payloads):
+    """one UpdateNetworkConfig payload per template, with the vlan attributes of all its NICs"""
+    merged = OrderedDict()
+    for payload in payloads:
+        template_payload = merged.setdefault(payload["TemplateId"],
+                                             {"TemplateId": payload["TemplateId"], "VlanAttributes": []})
+        template_payload["VlanAttributes"].extend(payload["VlanAttributes"])
+    return list(merged.values())
+
+
+def post_vlan_payload(rest_obj, payload):
+    """returns the error of the UpdateNetworkConfig request, None when it is applied"""
+    try:
+        resp = rest_obj.invoke_request("POST", UPDATE_NETWORK_CONFIG, data=payload)
+    except HTTPError as err:
+        try:
+            return json.load(err)
+        except ValueError:
+            return str(err)
+    except (URLError, SSLError, ConnectionError, SSLValidationError) as err:
+        return str(err)
+    if not resp.success:
+        return "Unexpected status code {0}".format(resp.status_code)
+    return None
+
+
+def apply_vlan_payloads(rest_obj, payloads):
+    """posts the UpdateNetworkConfig payloads, concurrently when there is more than one.
+    Returns the ids of the updated templates and the error of each failed template"""
+    if HAS_FUTURES and len(payloads) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(payloads), MAX_WORKERS)) as executor:
+            futures = [executor.submit(post_vlan_payload, rest_obj, payload) for payload in payloads]
+            errors = [future.result() for future in futures]
+    else:
+        errors = [post_vlan_payload(rest_obj, payload) for payload in payloads]
+    applied = [payload["TemplateId"] for payload, error in zip(payloads, errors) if error is None]
+    failed = dict((payload["TemplateId"], error) for payload, error in zip(payloads, errors) if error is not None)
+    return applied, failed
+
+
+def parse_vlan_ids(value):
+    """comma separated vlan ids of a tagged attribute as int list, empty and trailing entries are ignored"""
+    if not value:
+        return []
+    return [int(vlan_id) for vlan_id in value.translate(WHITESPACE_TABLE).split(",") if vlan_id]
+
+
+def get_template_vlan_info(module, resp, template_id, nic_id, wanted_ports=None):
+    """parses the vlan attributes of the NIC, only for I(wanted_ports) when given"""
     port_id_map = {}
     port_untagged_map = {}
     port_tagged_map = {}
-    resp = rest_obj.invoke_request('GET', TEMPLATE_ATTRIBUTE_VIEW.format(
-        template_id, NETWORK_HIERARCHY_VIEW))
     if resp.success:
-        nic_id = module.params.get("nic_identifier")
-        nic_model = resp.json_data.get('AttributeGroups', [])
+        nic_model = (resp.json_data or {}).get('AttributeGroups', [])
         nic_group = nic_model[0]['SubAttributeGroups']
-        nic_found = False
         for nic in nic_group:
             if nic_id == nic.get(KEY_ATTR_NAME):
-                nic_found = True
                 for port in nic.get(SUB_GRP_ATTR_NAME):  # ports
+                    port_number = port.get(GRP_NAME_ID_ATTR_NAME)
+                    if wanted_ports is not None and port_number not in wanted_ports:
+                        continue
                     for partition in port.get(SUB_GRP_ATTR_NAME):  # partitions
                         for attribute in partition.get(GRP_ATTR_NAME):  # attributes
-                            if attribute.get(CUSTOM_ID_ATTR_NAME) != 0:
-                                port_number = port.get(GRP_NAME_ID_ATTR_NAME)
-                                port_id_map[port_number] = attribute.get(CUSTOM_ID_ATTR_NAME)
-                                if attribute.get(KEY_ATTR_NAME).lower() == "vlan untagged":
+                            custom_id = attribute.get(CUSTOM_ID_ATTR_NAME)
+                            if custom_id != 0:
+                                port_id_map[port_number] = custom_id
+                                name = attribute.get(KEY_ATTR_NAME) or ""
+                                vlan_type = VLAN_ATTR_TYPES.get(name) or name.lower()
+                                if vlan_type == VLAN_UNTAGGED:
                                     port_untagged_map[port_number] = int(attribute['Value'])
-                                if attribute.get(KEY_ATTR_NAME).lower() == "vlan tagged":
-                                    port_tagged_map[port_number] = []
-                                    if attribute['Value']:
-                                        port_tagged_map[port_number] = \
-                                            list(map(int, (attribute['Value']).replace(" ", "").split(",")))
-        if not nic_found:
+                                elif vlan_type == VLAN_TAGGED:
+                                    port_tagged_map[port_number] = parse_vlan_ids(attribute['Value'])
+                break
+        else:
             module.fail_json(msg="NIC with name '{0}' not found for template with id {1}".format(nic_id, template_id))
     return port_id_map, port_untagged_map, port_tagged_map
 
 
 def compare_nested_dict(modify_setting_payload, existing_setting_payload):
     """compare existing and requested setting values of identity pool in case of modify operations
-    if both are same return True"""
-    for key, val in modify_setting_payload.items():
-        if existing_setting_payload.get(key) is None:
-            return False
-        elif isinstance(val, dict):
-            if not compare_nested_dict(val, existing_setting_payload.get(key)):
+    if both are same return True.
+    Keys only in the existing settings are ignored and lists are compared irrespective of order."""
+    stack = [(modify_setting_payload, existing_setting_payload)]
+    while stack:
+        modify, existing = stack.pop()
+        if modify is existing:
+            continue
+        if isinstance(modify, dict):
+            if not isinstance(existing, dict):
+                return False
+            for key, val in modify.items():
+                if key not in existing:
+                    return False
+                stack.append((val, existing[key]))
+        elif isinstance(modify, list):
+            if not isinstance(existing, list) or sorted(modify) != sorted(existing):  # vlan order is not significant
                 return False
-        elif val != existing_setting_payload.get(key):
+        elif modify != existing:
             return False
     return True
 
 
-def get_vlan_payload(module, rest_obj, untag_dict, tagged_dict):
+def get_vlan_payload(module, template_id, vlan_maps, untag_dict, tagged_dict, force=False):
+    """returns the UpdateNetworkConfig payload, None if the template already has the requested vlans
+    unless force is set"""
     payload = {}
-    template_id = module.params.get("template_id")
-    if not template_id:
-        template_id = get_item_id(rest_obj, module.params.get("template_name"), TEMPLATE_VIEW)
     payload["TemplateId"] = template_id
     # VlanAttributes
-    port_id_map, port_untagged_map, port_tagged_map = get_template_vlan_info(module, rest_obj, template_id)
-    untag_equal_dict = compare_nested_dict(untag_dict, port_untagged_map)
-    tag_equal_dict = compare_nested_dict(tagged_dict, port_tagged_map)
-    if untag_equal_dict and tag_equal_dict:
-        module.exit_json(msg="No changes found to be applied")
+    port_id_map, port_untagged_map, port_tagged_map = vlan_maps
+    if not force:
+        untag_equal_dict = compare_nested_dict(untag_dict, port_untagged_map)
+        tag_equal_dict = compare_nested_dict(tagged_dict, port_tagged_map)
+        if untag_equal_dict and tag_equal_dict:
+            return None
     vlan_attributes = []
     for pk, pv in port_id_map.items():
         mdict = {}
@@ -317,18 +685,46 @@ def get_vlan_payload(module, rest_obj, untag_dict, tagged_dict):
     return payload
 
 
-def get_key(val, my_dict):
-    for key, value in my_dict.items():
-        if val == value:
-            return key
-    return None
+def fail_vlan_overlap(module, vlan_id, port, vlan_name=None):
+    vlan = vlan_id if vlan_name is None else "{0}('{1}')".format(vlan_id, vlan_name)
+    module.fail_json(msg="vlan {0} cannot be in both tagged and untagged list for port {1}".format(vlan, port))
+
+
+def validate_ports(module, specs):
+    """fails on a NIC repeated for a template, on ports repeated within untagged_networks
+    or tagged_networks and on a vlan id both untagged and tagged on a port, before any request to OME"""
+    if not specs:
+        module.fail_json(msg="templates must contain at least one template")
+    template_nics = set()
+    for spec in specs:
+        template_nic = get_template_key(spec) + (spec.get("nic_identifier"),)
+        if template_nic in template_nics:
+            module.fail_json(msg="nic_identifier '{2}' repeated for the template with {0} {1}".format(*template_nic))
+        template_nics.add(template_nic)
+        for networks in ("untagged_networks", "tagged_networks"):
+            port_count = Counter(port_vlan["port"] for port_vlan in spec.get(networks) or [])
+            repeated = sorted(port for port, count in port_count.items() if count > 1)
+            if repeated:
+                module.fail_json(msg="port(s) {0} repeated in {1}".format(
+                    ", ".join(str(port) for port in repeated), networks))
+        tagged_ids = dict((tg["port"], tg.get("tagged_network_ids") or []) for tg in spec.get("tagged_networks") or [])
+        for utg in spec.get("untagged_networks") or []:
+            vlan = utg.get("untagged_network_id")
+            if vlan is not None and vlan in tagged_ids.get(utg["port"], []):
+                fail_vlan_overlap(module, vlan, utg["port"])
 
 
-def validate_vlans(module, rest_obj):
-    vlan_name_id_map = get_vlan_name_id_map(rest_obj)
-    vlan_name_id_map["0"] = 0
-    tagged_list = module.params.get("tagged_networks")
-    untag_list = module.params.get("untagged_networks")
+def validate_vlans(module, spec, vlan_name_id_map):
+    """vlan ids are not checked for existence when vlan_name_id_map is None, OME rejects them on update"""
+    valid_ids = None
+    if vlan_name_id_map is None:
+        vlan_name_id_map = {}
+        id_to_name = {}
+    else:
+        id_to_name = {v: k for k, v in vlan_name_id_map.items()}
+        valid_ids = set(id_to_name)
+    tagged_list = spec.get("tagged_networks")
+    untag_list = spec.get("untagged_networks")
     if not tagged_list and not untag_list:
         module.fail_json(msg="Either tagged_networks | untagged_networks "
                              "data needs to be provided")
@@ -338,11 +734,8 @@ def validate_vlans(module, rest_obj):
             p = utg["port"]
             excl_flag = False
             if utg.get("untagged_network_id") is not None:
-                if p in untag_dict:
-                    module.fail_json(msg="port {0} is repeated for "
-                                         "untagged_network_id".format(p))
                 vlan = utg.get("untagged_network_id")
-                if vlan not in vlan_name_id_map.values():
+                if vlan and valid_ids is not None and vlan not in valid_ids:  # 0 clears the untagged vlan
                     module.fail_json(msg="untagged_network_id: {0} is not a "
                                          "valid vlan id for port {1}".
                                      format(vlan, p))
@@ -354,14 +747,10 @@ def validate_vlans(module, rest_obj):
                                          "untagged_network_id are mutually exclusive "
                                          "for port {0}".format(p))
                 vlan = utg.get("untagged_network_name")
-                if vlan in vlan_name_id_map:
-                    if p in untag_dict:
-                        module.fail_json(msg="port {0} is repeated for "
-                                             "untagged_network_name".format(p))
-                    untag_dict[p] = vlan_name_id_map.get(vlan)
+                if vlan == "0" or vlan in vlan_name_id_map:
+                    untag_dict[p] = 0 if vlan == "0" else vlan_name_id_map.get(vlan)
                 else:
                     module.fail_json(msg="{0} is not a valid vlan name for port {1}".format(vlan, p))
-    vlan_name_id_map.pop("0")
     tagged_dict = {}
     if tagged_list:
         for tg in tagged_list:
@@ -372,28 +761,27 @@ def validate_vlans(module, rest_obj):
             if isinstance(tgnids, list):
                 if len(tgnids) == 0:
                     empty_list = True
-                for vl in tgnids:
-                    if vl not in vlan_name_id_map.values():
-                        module.fail_json(msg="{0} is not a valid vlan id "
-                                             "port {1}".format(vl, p))
-                    tg_list.append(vl)
+                bad_ids = set(tgnids) - valid_ids if valid_ids is not None else None
+                if bad_ids:
+                    module.fail_json(msg="Invalid vlan id(s) {0} found for port {1}".format(
+                        ", ".join(str(vl) for vl in sorted(bad_ids)), p))
+                tg_list.extend(tgnids)
             tgnames = tg.get("tagged_network_names")
             if isinstance(tgnames, list):
                 if len(tgnames) == 0:
                     empty_list = True
-                for vln in tgnames:
-                    if vln not in vlan_name_id_map:
-                        module.fail_json(msg="{0} is not a valid vlan name "
-                                             "port {1}".format(vln, p))
-                    tg_list.append(vlan_name_id_map.get(vln))
+                bad_names = [vln for vln in dict.fromkeys(tgnames) if vln not in vlan_name_id_map]
+                if bad_names:
+                    module.fail_json(msg="Invalid vlan name(s) {0} found for port {1}".format(
+                        ", ".join(bad_names), p))
+                tg_list.extend(vlan_name_id_map[vln] for vln in tgnames)
             if not tg_list and not empty_list:
                 module.fail_json(msg="No tagged_networks provided or valid tagged_networks not found for port {0}"
                                  .format(p))
-            tagged_dict[p] = list(set(tg_list))  # Will not report duplicates
+            tagged_dict[p] = list(dict.fromkeys(tg_list))  # Will not report duplicates, keeps the order
     for k, v in untag_dict.items():
         if v in tagged_dict.get(k, []):
-            module.fail_json(msg="vlan {0}('{1}') cannot be in both tagged and untagged list for port {2}".
-                             format(v, get_key(v, vlan_name_id_map), k))
+            fail_vlan_overlap(module, v, k, id_to_name.get(v))
     return untag_dict, tagged_dict
 
 
@@ -404,6 +792,11 @@ def main():
     port_tagged_spec = {"port": {"required": True, "type": "int"},
                         "tagged_network_ids": {"type": "list", "elements": "int"},
                         "tagged_network_names": {"type": "list", "elements": "str"}}
+    template_spec = {"template_id": {"type": "int"},
+                     "template_name": {"type": "str"},
+                     "nic_identifier": {"required": True, "type": "str"},
+                     "untagged_networks": {"type": "list", "elements": "dict", "options": port_untagged_spec},
+                     "tagged_networks": {"type": "list", "elements": "dict", "options": port_tagged_spec}}
     module = AnsibleModule(
         argument_spec={
             "hostname": {"required": True, "type": "str"},
@@ -412,23 +805,63 @@ def main():
             "port": {"required": False, "type": "int", "default": 443},
             "template_name": {"required": False, "type": "str"},
             "template_id": {"required": False, "type": "int"},
-            "nic_identifier": {"required": True, "type": "str"},
+            "nic_identifier": {"required": False, "type": "str"},
             "untagged_networks": {"required": False, "type": "list", "elements": "dict", "options": port_untagged_spec},
-            "tagged_networks": {"required": False, "type": "list", "elements": "dict", "options": port_tagged_spec}
+            "tagged_networks": {"required": False, "type": "list", "elements": "dict", "options": port_tagged_spec},
+            "force": {"required": False, "type": "bool", "default": False},
+            "templates": {"required": False, "type": "list", "elements": "dict", "options": template_spec,
+                          "required_one_of": [("template_id", "template_name"),
+                                              ("untagged_networks", "tagged_networks")],
+                          "mutually_exclusive": [("template_id", "template_name")]}
         },
-        required_one_of=[("template_id", "template_name"),
-                         ("untagged_networks", "tagged_networks")],
-        mutually_exclusive=[("template_id", "template_name"),
+        required_one_of=[("template_id", "template_name", "templates"),
+                         ("untagged_networks", "tagged_networks", "templates")],
+        mutually_exclusive=[("template_id", "template_name", "templates"),
+                            ("templates", "nic_identifier"),
+                            ("templates", "untagged_networks"),
+                            ("templates", "tagged_networks"),
                             ("untagged_network_id", "untagged_network_name")],
+        required_by={"template_id": "nic_identifier", "template_name": "nic_identifier"},
     )
     try:
+        specs = get_template_specs(module)
+        validate_ports(module, specs)
         with RestOME(module.params, req_session=True) as rest_obj:
-            untag_dict, tagged_dict = validate_vlans(module, rest_obj)
-            payload = get_vlan_payload(module, rest_obj, untag_dict, tagged_dict)
-            resp = rest_obj.invoke_request("POST", UPDATE_NETWORK_CONFIG, data=payload)
-            if resp.success:
+            template_groups = group_template_specs(specs)
+            vlan_name_id_map, template_views = fetch_template_and_vlans(rest_obj, template_groups, module.params)
+            payloads = []
+            template_nics = set()
+            for template_specs, template_view in zip(template_groups, template_views):
+                template_id = template_view[0]
+                for spec in template_specs:
+                    nic_id = spec.get("nic_identifier")
+                    if (template_id, nic_id) in template_nics:  # same template given by id and by name
+                        module.fail_json(msg="nic_identifier '{0}' repeated for the template with "
+                                             "template_id {1}".format(nic_id, template_id))
+                    template_nics.add((template_id, nic_id))
+                    untag_dict, tagged_dict = validate_vlans(module, spec, vlan_name_id_map)
+                    vlan_maps = get_template_vlan_maps(module, spec, template_view, module.params)
+                    payload = get_vlan_payload(module, template_id, vlan_maps, untag_dict, tagged_dict,
+                                               module.params.get("force"))
+                    if payload:
+                        payloads.append(payload)
+            if not payloads:
+                module.exit_json(msg="No changes found to be applied")
+            if module.params.get("templates") is None:
+                # errors of a single template reach the handlers below
+                resp = rest_obj.invoke_request("POST", UPDATE_NETWORK_CONFIG, data=payloads[0])
+                if not resp.success:
+                    module.fail_json(msg="Unable to apply the network settings to the template")
                 module.exit_json(msg="Successfully applied the network "
                                      "settings to the template", changed=True)
+            applied, failed = apply_vlan_payloads(rest_obj, merge_vlan_payloads(payloads))
+            if failed:
+                module.fail_json(msg="Unable to apply the network settings to the template(s) {0}".format(
+                    ", ".join(str(template_id) for template_id in sorted(failed))),
+                    changed=bool(applied), applied_template_ids=applied, failed_template_ids=sorted(failed),
+                    error_info=failed)
+            module.exit_json(msg="Successfully applied the network "
+                                 "settings to the template", changed=True, applied_template_ids=applied)
     except HTTPError as err:
         module.fail_json(msg=str(err), error_info=json.load(err))
     except URLError as err:
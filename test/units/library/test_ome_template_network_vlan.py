@@ -36,6 +36,49 @@ def ome_connection_mock_for_template_network_vlan(mocker, ome_response_mock):
     return ome_connection_mock_obj
 
 
+@pytest.fixture
+def cache_params(mocker, tmpdir):
+    """cache params of the OME host in ome_default_args, the vlan cache is kept in tmpdir"""
+    mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.VLAN_CACHE_DIR',
+                 new=str(tmpdir))
+    return {"hostname": "192.168.0.1", "port": 443, "username": "username"}
+
+
+@pytest.fixture(params=[True, False], ids=["futures", "sequential"])
+def has_futures(request, mocker):
+    mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.HAS_FUTURES',
+                 new=request.param)
+    return request.param
+
+
+def get_attribute_view(nics):
+    """AttributeViewDetails with no vlans on port 1 of each (nic_identifier, CustomId) in nics"""
+    return {"AttributeGroups": [{"GroupNameId": 1001, "DisplayName": "NICModel", "SubAttributeGroups": [
+        {"GroupNameId": 1, "DisplayName": nic_id, "Attributes": [], "SubAttributeGroups": [
+            {"GroupNameId": 1, "Attributes": [], "SubAttributeGroups": [
+                {"GroupNameId": 1, "DisplayName": "Partition", "SubAttributeGroups": [],
+                 "Attributes": [{"CustomId": custom_id, "DisplayName": "Vlan UnTagged", "Value": "0"},
+                                {"CustomId": custom_id, "DisplayName": "Vlan Tagged", "Value": ""}]}]}]}
+        for nic_id, custom_id in nics]}]}
+
+
+def get_invoke_request(views, post_errors=None):
+    """invoke_request of a fake OME returning the AttributeViewDetails in views by template id,
+    the POSTed payloads are collected in the returned list"""
+    posted = []
+
+    def invoke_request(method, path, data=None, **kwargs):
+        resp = MagicMock(success=True, status_code=200, headers={})
+        if method == "POST":
+            posted.append(data)
+            if data["TemplateId"] in (post_errors or {}):
+                raise post_errors[data["TemplateId"]]
+        else:
+            resp.json_data = views[int(path.split("(")[1].split(")")[0])]
+        return resp
+    return invoke_request, posted
+
+
 class TestOmeTemplateNetworkVlan(FakeAnsibleModule):
     module = ome_template_network_vlan
 
@@ -64,28 +107,178 @@ class TestOmeTemplateNetworkVlan(FakeAnsibleModule):
         assert "msg" in result
         assert result["msg"] == "Successfully applied the network settings to template"
 
+    @pytest.fixture
+    def templates_args(self, cache_params, ome_default_args):
+        ome_default_args.update({"templates": [
+            {"template_id": 5, "nic_identifier": "NIC Slot 1", "untagged_networks": [{"port": 1, "untagged_network_id": 7}]},
+            {"template_id": 5, "nic_identifier": "NIC Slot 2", "untagged_networks": [{"port": 1, "untagged_network_id": 8}]},
+            {"template_id": 99, "nic_identifier": "NIC Slot 1", "tagged_networks": [{"port": 1, "tagged_network_ids": [7]}]}]})
+        return ome_default_args
+
+    def test_main_multiple_templates(self, templates_args, ome_connection_mock_for_template_network_vlan):
+        invoke_request, posted = get_invoke_request({5: get_attribute_view([("NIC Slot 1", 2301), ("NIC Slot 2", 2302)]),
+                                                     99: get_attribute_view([("NIC Slot 1", 2401)])})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        result = self.execute_module(templates_args)
+        assert result["changed"] is True
+        assert result["msg"] == "Successfully applied the network settings to the template"
+        assert sorted(result["applied_template_ids"]) == [5, 99]
+        assert sorted(posted, key=lambda payload: payload["TemplateId"]) == [
+            {"TemplateId": 5, "VlanAttributes": [{"ComponentId": 2301, "Untagged": 7, "Tagged": []},
+                                                 {"ComponentId": 2302, "Untagged": 8, "Tagged": []}]},
+            {"TemplateId": 99, "VlanAttributes": [{"ComponentId": 2401, "Untagged": 0, "Tagged": [7]}]}]
+        assert ome_connection_mock_for_template_network_vlan.invoke_request.call_count == 4
+
+    def test_main_partial_failure(self, templates_args, ome_connection_mock_for_template_network_vlan):
+        invoke_request, posted = get_invoke_request(
+            {5: get_attribute_view([("NIC Slot 1", 2301), ("NIC Slot 2", 2302)]),
+             99: get_attribute_view([("NIC Slot 1", 2401)])},
+            {99: HTTPError('http://testhost.com', 400, 'http error message', {"accept-type": "application/json"},
+                           StringIO(to_text(json.dumps({"info": "error_details"}))))})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        result = ast.literal_eval(self._run_module_with_fail_json(templates_args)["msg"])
+        assert result["failed"] is True
+        assert result["changed"] is True
+        assert result["msg"] == "Unable to apply the network settings to the template(s) 99"
+        assert result["applied_template_ids"] == [5]
+        assert result["failed_template_ids"] == [99]
+        assert result["error_info"] == {99: {"info": "error_details"}}
+
+    def test_main_no_changes(self, cache_params, ome_default_args, ome_connection_mock_for_template_network_vlan):
+        invoke_request, posted = get_invoke_request({5: get_attribute_view([("NIC Slot 1", 2301)])})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        ome_default_args.update({"template_id": 5, "nic_identifier": "NIC Slot 1",
+                                 "untagged_networks": [{"port": 1, "untagged_network_id": 0}],
+                                 "tagged_networks": [{"port": 1, "tagged_network_ids": []}]})
+        result = self.execute_module(ome_default_args)
+        assert result["changed"] is False
+        assert result["msg"] == "No changes found to be applied"
+        assert posted == []
+
+    @pytest.fixture
+    def single_template_args(self, cache_params, ome_default_args):
+        ome_default_args.update({"template_id": 5, "nic_identifier": "NIC Slot 1",
+                                 "untagged_networks": [{"port": 1, "untagged_network_id": 7}]})
+        return ome_default_args
+
+    def test_main_single_template_http_error(self, single_template_args, ome_connection_mock_for_template_network_vlan):
+        invoke_request, posted = get_invoke_request(
+            {5: get_attribute_view([("NIC Slot 1", 2301)])},
+            {5: HTTPError('http://testhost.com', 400, 'http error message', {"accept-type": "application/json"},
+                          StringIO(to_text(json.dumps({"error": {"message": "error_details"}}))))})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        result = self._run_module_with_fail_json(single_template_args)
+        assert result["msg"] == "HTTP Error 400: http error message"
+        assert result["error_info"] == {"error": {"message": "error_details"}}
+        assert "applied_template_ids" not in result
+
+    def test_main_single_template_url_error(self, single_template_args, ome_connection_mock_for_template_network_vlan):
+        invoke_request, posted = get_invoke_request({5: get_attribute_view([("NIC Slot 1", 2301)])},
+                                                    {5: URLError('url error')})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        result = self._run_module(single_template_args)
+        assert result["unreachable"] is True
+        assert result["msg"] == "<urlopen error url error>"
+
+    def test_main_empty_templates(self, ome_default_args, ome_connection_mock_for_template_network_vlan):
+        ome_default_args.update({"templates": []})
+        result = ast.literal_eval(self._run_module_with_fail_json(ome_default_args)["msg"])
+        assert result["msg"] == "templates must contain at least one template"
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_not_called()
+
+    def test_main_repeated_nic(self, templates_args, ome_connection_mock_for_template_network_vlan):
+        templates_args["templates"][1]["nic_identifier"] = "NIC Slot 1"
+        result = ast.literal_eval(self._run_module_with_fail_json(templates_args)["msg"])
+        assert result["msg"] == "nic_identifier 'NIC Slot 1' repeated for the template with template_id 5"
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_not_called()
+
+    def test_main_repeated_nic_by_name(self, mocker, templates_args, ome_connection_mock_for_template_network_vlan):
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_item_id', return_value=5)
+        invoke_request, posted = get_invoke_request({5: get_attribute_view([("NIC Slot 1", 2301)]),
+                                                     99: get_attribute_view([("NIC Slot 1", 2401)])})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = invoke_request
+        templates_args["templates"][1] = {"template_name": "template5", "nic_identifier": "NIC Slot 1",
+                                          "untagged_networks": [{"port": 1, "untagged_network_id": 8}]}
+        result = ast.literal_eval(self._run_module_with_fail_json(templates_args)["msg"])
+        assert result["msg"] == "nic_identifier 'NIC Slot 1' repeated for the template with template_id 5"
+        assert posted == []
 
     def test_get_item_id(self, ome_connection_mock_for_template_network_vlan, ome_response_mock):
         ome_response_mock.success = True
         ome_response_mock.json_data = { "value": [{"Name": "template_name", "Id": 123}]}
         id = self.module.get_item_id(ome_connection_mock_for_template_network_vlan, "template_name", "uri")
         assert id == 123
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_called_with(
+            'GET', "uri", query_param={"$filter": "Name eq 'template_name'"})
+
+    def test_get_item_id_filter_rejected(self, ome_connection_mock_for_template_network_vlan, ome_response_mock):
+        ome_response_mock.success = True
+        ome_response_mock.json_data = {"value": [{"Name": "other", "Id": 122}, {"Name": "template_name", "Id": 123}]}
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = [
+            HTTPError('http://testhost.com', 400, 'http error message', {"accept-type": "application/json"},
+                      StringIO(to_text(json.dumps({"info": "error_details"})))),
+            ome_response_mock]
+        id = self.module.get_item_id(ome_connection_mock_for_template_network_vlan, "template_name", "uri")
+        assert id == 123
 
-    def test_get_key(self):
-        val = "1"
-        d = {"one": "1", "two": "2"}
-        k = self.module.get_key(val, d)
-        assert k == "one"
+    @pytest.mark.parametrize("code", [401, 404, 500])
+    def test_get_item_id_http_error(self, ome_connection_mock_for_template_network_vlan, code):
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = \
+            HTTPError('http://testhost.com', code, 'http error message', {"accept-type": "application/json"},
+                      StringIO(to_text(json.dumps({"info": "error_details"}))))
+        with pytest.raises(HTTPError):
+            self.module.get_item_id(ome_connection_mock_for_template_network_vlan, "template_name", "uri")
+        assert ome_connection_mock_for_template_network_vlan.invoke_request.call_count == 1
 
-    def test_get_vlan_name_id_map(self, ome_connection_mock_for_template_network_vlan, ome_response_mock):
+    def test_get_vlan_name_id_map(self, ome_response_mock):
         ome_response_mock.success = True
         ome_response_mock.json_data = {"value": [{"Name": "vlan1", "Id": 1},
                                                  {"Name": "vlan2", "Id": 2}]}
-        d = self.module.get_vlan_name_id_map(ome_connection_mock_for_template_network_vlan)
+        d = self.module.get_vlan_name_id_map(ome_response_mock)
         assert d == {"vlan1":1, "vlan2":2}
 
+    def test_get_vlan_name_id_map_stream(self, mocker, ome_response_mock):
+        pytest.importorskip("ijson.backends.yajl2_c")
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.HAS_IJSON', new=True)
+        ome_response_mock.success = True
+        ome_response_mock.body = json.dumps({"value": [{"Name": "vlan1", "Id": 1, "Description": "vlan one"},
+                                                       {"Id": 2, "Name": "vlan2"}]}).encode()
+        d = self.module.get_vlan_name_id_map(ome_response_mock)
+        assert d == {"vlan1": 1, "vlan2": 2}
+
+    def test_fetch_vlan_name_id_map_cache_saved(self, tmpdir, cache_params, ome_connection_mock_for_template_network_vlan,
+                                                ome_response_mock):
+        ome_response_mock.success = True
+        ome_response_mock.headers = {"ETag": "etag1"}
+        ome_response_mock.json_data = {"value": [{"Name": "vlan1", "Id": 1}]}
+        d = self.module.fetch_vlan_name_id_map(ome_connection_mock_for_template_network_vlan, cache_params)
+        assert d == {"vlan1": 1}
+        assert self.module.load_cache(str(tmpdir.join("ome_vlan_cache_192.168.0.1_443_username.json"))) == \
+            {"etag": "etag1", "networks": {"vlan1": 1}}
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_called_with(
+            'GET', self.module.VLAN_NETWORKS, headers=None)
+
+    def test_save_cache_failure(self, mocker, tmpdir):
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.os.rename',
+                     side_effect=OSError("rename failed"))
+        self.module.save_cache(str(tmpdir.join("ome_vlan_cache.json")), {"etag": "etag1"})
+        assert tmpdir.listdir() == []
+
+    def test_get_cache_path_port(self, cache_params):
+        assert self.module.get_cache_path(cache_params, "template", 12) != \
+            self.module.get_cache_path(dict(cache_params, port=8443), "template", 12)
+
+    def test_fetch_vlan_name_id_map_not_modified(self, cache_params, ome_connection_mock_for_template_network_vlan):
+        self.module.save_cache(self.module.get_cache_path(cache_params), {"etag": "etag1", "networks": {"vlan1": 1}})
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = \
+            HTTPError('http://testhost.com', 304, 'Not Modified', {}, None)
+        d = self.module.fetch_vlan_name_id_map(ome_connection_mock_for_template_network_vlan, cache_params)
+        assert d == {"vlan1": 1}
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_called_with(
+            'GET', self.module.VLAN_NETWORKS, headers={"If-None-Match": "etag1"})
+
     def test_get_template_vlan_info(self, ome_connection_mock_for_template_network_vlan, ome_response_mock):
-        f_module = self.get_module_mock(params={"nic_identifier": "NIC Slot 4"})
+        f_module = self.get_module_mock()
         temp_net_details = {
                                 "AttributeGroups": [{
                                     "GroupNameId": 1001,"DisplayName": "NICModel",
@@ -109,40 +302,274 @@ class TestOmeTemplateNetworkVlan(FakeAnsibleModule):
         ome_response_mock.success = True
         ome_response_mock.json_data = temp_net_details
         port_id_map, port_untagged_map, port_tagged_map = self.module.get_template_vlan_info(
-            f_module, ome_connection_mock_for_template_network_vlan, 12)
+            f_module, ome_response_mock, 12, "NIC Slot 4")
         assert port_id_map == {1: 2302, 2:2301}
         assert port_untagged_map == {1: 12766, 2: 12767}
         assert port_tagged_map == {1: [12765, 12767, 12768], 2: [12766]}
+        port_id_map, port_untagged_map, port_tagged_map = self.module.get_template_vlan_info(
+            f_module, ome_response_mock, 12, "NIC Slot 4", {2, 3})
+        assert port_id_map == {2: 2301}
+        assert port_untagged_map == {2: 12767}
+        assert port_tagged_map == {2: [12766]}
+
+    @pytest.mark.parametrize("value, vlan_ids", [("12765, 12767, 12768", [12765, 12767, 12768]),
+                                                  ("12765,\t12767,", [12765, 12767]), ("", []), (None, [])])
+    def test_parse_vlan_ids(self, value, vlan_ids):
+        assert self.module.parse_vlan_ids(value) == vlan_ids
+
+    def test_get_spec_ports(self):
+        spec = {"untagged_networks": [{"port": 1}, {"port": 2}], "tagged_networks": [{"port": 2}, {"port": 4}]}
+        assert self.module.get_spec_ports(spec) == {1, 2, 4}
+        assert self.module.get_spec_ports({"untagged_networks": None}) == set()
+
+    def test_get_template_attribute_view(self, ome_connection_mock_for_template_network_vlan, ome_response_mock):
+        ome_response_mock.success = True
+        ome_response_mock.json_data = {"value": [{"Name": "template_name", "Id": 12}]}
+        template_id, resp, cache = self.module.get_template_attribute_view(
+            ome_connection_mock_for_template_network_vlan, [{"template_name": "template_name"}])
+        assert template_id == 12
+        assert resp is ome_response_mock
+        assert cache == {}
+
+    def test_get_template_vlan_maps_cached(self, mocker, cache_params, ome_connection_mock_for_template_network_vlan,
+                                           ome_response_mock):
+        f_module = self.get_module_mock()
+        spec = {"template_id": 12, "nic_identifier": "NIC Slot 4"}
+        vlan_maps = ({1: 2302}, {1: 12766}, {1: [12765]})
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_template_vlan_info',
+                     return_value=vlan_maps)
+        ome_response_mock.success = True
+        ome_response_mock.headers = {"ETag": "etag1"}
+        assert self.module.get_template_vlan_maps(f_module, spec, (12, ome_response_mock, {}), cache_params) == vlan_maps
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = \
+            HTTPError('http://testhost.com', 304, 'Not Modified', {}, None)
+        template_view = self.module.get_template_attribute_view(ome_connection_mock_for_template_network_vlan, [spec],
+                                                                cache_params)
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_called_with(
+            'GET', "TemplateService/Templates(12)/Views(4)/AttributeViewDetails", headers={"If-None-Match": "etag1"})
+        assert template_view[:2] == (12, None)
+        assert self.module.get_template_vlan_maps(f_module, spec, template_view, cache_params) == vlan_maps
+
+    def test_get_template_vlan_maps_cache_nics(self, mocker, cache_params, ome_connection_mock_for_template_network_vlan,
+                                               ome_response_mock):
+        f_module = self.get_module_mock()
+        specs = [{"template_id": 12, "nic_identifier": "NIC Slot 4", "untagged_networks": [{"port": 1}]},
+                 {"template_id": 12, "nic_identifier": "NIC Slot 1", "untagged_networks": [{"port": 1}]}]
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_template_vlan_info',
+                     return_value=({1: 2302}, {1: 12766}, {1: []}))
+        ome_response_mock.success = True
+        ome_response_mock.headers = {"ETag": "etag1"}
+        for spec in specs:
+            self.module.get_template_vlan_maps(f_module, spec, (12, ome_response_mock, {}), cache_params)
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = \
+            HTTPError('http://testhost.com', 304, 'Not Modified', {}, None)
+        self.module.get_template_attribute_view(ome_connection_mock_for_template_network_vlan, specs, cache_params)
+        ome_connection_mock_for_template_network_vlan.invoke_request.assert_called_with(
+            'GET', "TemplateService/Templates(12)/Views(4)/AttributeViewDetails", headers={"If-None-Match": "etag1"})
+
+    def test_fetch_template_and_vlans(self, mocker, ome_connection_mock_for_template_network_vlan,
+                                      ome_response_mock, has_futures):
+        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_vlan_name_id_map',
+                     return_value={"vlan1": 1})
+        template_groups = [[{"template_id": 12, "tagged_networks": [{"port": 1, "tagged_network_names": ["vlan1"]}]},
+                            {"template_id": 12, "nic_identifier": "NIC Slot 1"}],
+                           [{"template_id": 13}]]
+        vlan_name_id_map, template_views = self.module.fetch_template_and_vlans(
+            ome_connection_mock_for_template_network_vlan, template_groups)
+        assert vlan_name_id_map == {"vlan1": 1}
+        assert template_views == [(12, ome_response_mock, {}), (13, ome_response_mock, {})]
+        assert ome_connection_mock_for_template_network_vlan.invoke_request.call_count == 3
+
+    def test_fetch_template_and_vlans_ids_only(self, ome_connection_mock_for_template_network_vlan,
+                                               ome_response_mock, has_futures):
+        template_groups = [[{"template_id": 12, "untagged_networks": [{"port": 1, "untagged_network_id": 5}]}]]
+        vlan_name_id_map, template_views = self.module.fetch_template_and_vlans(
+            ome_connection_mock_for_template_network_vlan, template_groups)
+        assert vlan_name_id_map is None
+        assert template_views == [(12, ome_response_mock, {})]
+        assert ome_connection_mock_for_template_network_vlan.invoke_request.call_count == 1
+
+    @pytest.mark.parametrize("spec, needed", [
+        ({"untagged_networks": [{"port": 1, "untagged_network_id": 5, "untagged_network_name": None}]}, False),
+        ({"untagged_networks": [{"port": 1, "untagged_network_id": None, "untagged_network_name": "0"}]}, False),
+        ({"tagged_networks": [{"port": 1, "tagged_network_ids": [5], "tagged_network_names": []}]}, False),
+        ({"untagged_networks": [{"port": 1, "untagged_network_id": None, "untagged_network_name": "plat"}]}, True),
+        ({"tagged_networks": [{"port": 1, "tagged_network_ids": None, "tagged_network_names": ["gold"]}]}, True)])
+    def test_needs_vlan_names(self, spec, needed):
+        assert self.module.needs_vlan_names([{"template_id": 12}, spec]) is needed
+
+    def test_apply_vlan_payloads(self, ome_connection_mock_for_template_network_vlan,
+                                 ome_response_mock, has_futures):
+        ome_response_mock.success = True
+        payloads = [{"TemplateId": 12, "VlanAttributes": []}, {"TemplateId": 13, "VlanAttributes": []}]
+        assert self.module.apply_vlan_payloads(ome_connection_mock_for_template_network_vlan, payloads) == ([12, 13], {})
+        assert ome_connection_mock_for_template_network_vlan.invoke_request.call_count == 2
+
+    def test_apply_vlan_payloads_partial_failure(self, ome_connection_mock_for_template_network_vlan,
+                                                 ome_response_mock, has_futures):
+        ome_response_mock.success = True
+        ome_connection_mock_for_template_network_vlan.invoke_request.side_effect = [
+            ome_response_mock,
+            HTTPError('http://testhost.com', 400, 'http error message', {"accept-type": "application/json"},
+                      StringIO(to_text(json.dumps({"info": "error_details"})))),
+            URLError('url error')]
+        payloads = [{"TemplateId": 12, "VlanAttributes": []}, {"TemplateId": 13, "VlanAttributes": []},
+                    {"TemplateId": 14, "VlanAttributes": []}]
+        applied, failed = self.module.apply_vlan_payloads(ome_connection_mock_for_template_network_vlan, payloads[:1])
+        assert applied == [12]
+        applied, failed = self.module.apply_vlan_payloads(ome_connection_mock_for_template_network_vlan, payloads[1:])
+        assert applied == []
+        assert failed == {13: {"info": "error_details"}, 14: "<urlopen error url error>"}
+
+    def test_merge_vlan_payloads(self):
+        payloads = [{"TemplateId": 12, "VlanAttributes": [{"ComponentId": 2302}]},
+                    {"TemplateId": 13, "VlanAttributes": [{"ComponentId": 2401}]},
+                    {"TemplateId": 12, "VlanAttributes": [{"ComponentId": 2311}]}]
+        assert self.module.merge_vlan_payloads(payloads) == [
+            {"TemplateId": 12, "VlanAttributes": [{"ComponentId": 2302}, {"ComponentId": 2311}]},
+            {"TemplateId": 13, "VlanAttributes": [{"ComponentId": 2401}]}]
+
+    def test_group_template_specs(self):
+        specs = [{"template_id": 12, "nic_identifier": "NIC Slot 4"}, {"template_name": "t1", "nic_identifier": "NIC Slot 4"},
+                 {"template_id": 12, "nic_identifier": "NIC Slot 1"}]
+        assert self.module.group_template_specs(specs) == [[specs[0], specs[2]], [specs[1]]]
+
+    def test_get_template_specs(self):
+        f_module = self.get_module_mock(params={"template_id": 12, "template_name": None, "nic_identifier": "NIC Slot 4",
+                                                "untagged_networks": None, "tagged_networks": [], "templates": None})
+        assert self.module.get_template_specs(f_module) == [{"template_id": 12, "template_name": None,
+                                                             "nic_identifier": "NIC Slot 4",
+                                                             "untagged_networks": None, "tagged_networks": []}]
+        templates = [{"template_id": 12, "nic_identifier": "NIC Slot 4"}]
+        f_module = self.get_module_mock(params={"templates": templates})
+        assert self.module.get_template_specs(f_module) == templates
+        f_module = self.get_module_mock(params={"template_id": None, "templates": []})
+        assert self.module.get_template_specs(f_module) == []
 
     def test_get_vlan_payload(self, mocker, ome_connection_mock_for_template_network_vlan):
-        f_module = self.get_module_mock(params={"template_id": 12})
+        f_module = self.get_module_mock()
         untag_dict = {1: 12766}
         tagged_dict = {2: [12765, 12766]}
         port_id_map = {1: 2302, 2: 2301}
         port_untagged_map = {1: 12766, 2: 12767}
         port_tagged_map = {1: [12765, 12767, 12768], 2: [12766]}
-        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_template_vlan_info',
-                     return_value=(port_id_map, port_untagged_map, port_tagged_map))
-        payload = self.module.get_vlan_payload(f_module, ome_connection_mock_for_template_network_vlan, untag_dict, tagged_dict)
+        payload = self.module.get_vlan_payload(f_module, 12, (port_id_map, port_untagged_map, port_tagged_map),
+                                               untag_dict, tagged_dict)
         assert payload["TemplateId"] == 12
         assert payload["VlanAttributes"] == [{"ComponentId":2302,"Tagged":[12765, 12767, 12768], "Untagged":12766},
                                              {"ComponentId":2301,"Tagged":[12765, 12766], "Untagged":12767}]
 
-    def test_validate_vlans(self, mocker, ome_connection_mock_for_template_network_vlan):
-        f_module = self.get_module_mock(params={ "tagged_networks": [
+    def test_get_vlan_payload_no_changes(self, mocker, ome_connection_mock_for_template_network_vlan):
+        f_module = self.get_module_mock()
+        payload = self.module.get_vlan_payload(f_module, 12, ({1: 2302}, {1: 12766}, {1: [12765]}),
+                                               {1: 12766}, {1: [12765]})
+        assert payload is None
+
+    def test_get_vlan_payload_force(self):
+        f_module = self.get_module_mock()
+        payload = self.module.get_vlan_payload(f_module, 12, ({1: 2302}, {1: 12766}, {1: [12765]}),
+                                               {1: 12766}, {1: [12765]}, force=True)
+        assert payload == {"TemplateId": 12,
+                           "VlanAttributes": [{"ComponentId": 2302, "Tagged": [12765], "Untagged": 12766}]}
+
+    def test_validate_vlans(self):
+        f_module = self.get_module_mock()
+        spec = {"tagged_networks": [
                 {"port": 1,"tagged_network_ids": [1,2]},
                 {"port": 2,"tagged_network_names": []},
                 {"port": 3,"tagged_network_names": ["bronze"]}],
             "untagged_networks": [
                 {"port": 1,"untagged_network_name": "plat"},
                 {"port": 2,"untagged_network_id": 0},
-                {"port": 3,"untagged_network_id": 4}]})
-        mocker.patch('ansible.modules.remote_management.dellemc.ome_template_network_vlan.get_vlan_name_id_map',
-                     return_value={"vlan1":1, "vlan2":2, "gold":3, "silver":4, "plat":5, "bronze": 6})
-        untag_dict, tagged_dict = self.module.validate_vlans(f_module, ome_connection_mock_for_template_network_vlan)
+                {"port": 3,"untagged_network_id": 4}]}
+        vlan_name_id_map = {"vlan1":1, "vlan2":2, "gold":3, "silver":4, "plat":5, "bronze": 6}
+        untag_dict, tagged_dict = self.module.validate_vlans(f_module, spec, vlan_name_id_map)
         assert untag_dict == {1: 5, 2: 0, 3:4}
         assert tagged_dict == {1:[1,2], 2: [], 3:[6]}
 
+    @pytest.mark.parametrize("tagged, msg", [
+        ({"port": 1, "tagged_network_ids": [9, 1, 7]}, "Invalid vlan id(s) 7, 9 found for port 1"),
+        ({"port": 2, "tagged_network_names": ["gold", "tin", "lead", "tin"]}, "Invalid vlan name(s) tin, lead found for port 2")])
+    def test_validate_vlans_invalid_tagged(self, tagged, msg):
+        f_module = self.get_module_mock()
+        with pytest.raises(AnsibleFailJSonException) as exc:
+            self.module.validate_vlans(f_module, {"tagged_networks": [tagged]}, {"vlan1": 1, "gold": 3})
+        assert exc.value.fail_msg == msg
+
+    @pytest.mark.parametrize("spec, msg", [
+        ({"untagged_networks": [{"port": 1}, {"port": 2}, {"port": 1}]}, "port(s) 1 repeated in untagged_networks"),
+        ({"untagged_networks": [{"port": 1}],
+          "tagged_networks": [{"port": 3}, {"port": 2}, {"port": 3}, {"port": 2}]}, "port(s) 2, 3 repeated in tagged_networks")])
+    def test_validate_ports(self, spec, msg):
+        f_module = self.get_module_mock()
+        with pytest.raises(AnsibleFailJSonException) as exc:
+            self.module.validate_ports(f_module, [{"template_id": 12, "untagged_networks": [{"port": 1}]},
+                                                  dict(spec, template_id=13)])
+        assert exc.value.fail_msg == msg
+
+    def test_validate_ports_unique(self):
+        f_module = self.get_module_mock()
+        self.module.validate_ports(f_module, [{"template_id": 12, "nic_identifier": "NIC Slot 4",
+                                               "untagged_networks": [{"port": 1}], "tagged_networks": [{"port": 1}]},
+                                              {"template_id": 12, "nic_identifier": "NIC Slot 1",
+                                               "untagged_networks": None, "tagged_networks": [{"port": 2}]},
+                                              {"template_name": "12", "nic_identifier": "NIC Slot 4",
+                                               "untagged_networks": [{"port": 1}]}])
+        f_module.fail_json.assert_not_called()
+
+    def test_validate_ports_vlan_overlap(self):
+        f_module = self.get_module_mock()
+        with pytest.raises(AnsibleFailJSonException) as exc:
+            self.module.validate_ports(f_module, [{"template_id": 12, "untagged_networks": [{"port": 1, "untagged_network_id": 7},
+                                                                                            {"port": 2, "untagged_network_id": 8}],
+                                                   "tagged_networks": [{"port": 1, "tagged_network_ids": [8]},
+                                                                       {"port": 2, "tagged_network_ids": [8, 9]}]}])
+        assert exc.value.fail_msg == "vlan 8 cannot be in both tagged and untagged list for port 2"
+
+    @pytest.mark.parametrize("vlan_name_id_map, msg", [
+        (None, "vlan 1 cannot be in both tagged and untagged list for port 1"),
+        ({"vlan1": 1}, "vlan 1('vlan1') cannot be in both tagged and untagged list for port 1")])
+    def test_validate_vlans_overlap(self, vlan_name_id_map, msg):
+        f_module = self.get_module_mock()
+        spec = {"untagged_networks": [{"port": 1, "untagged_network_id": 1}],
+                "tagged_networks": [{"port": 1, "tagged_network_ids": [1]}]}
+        with pytest.raises(AnsibleFailJSonException) as exc:
+            self.module.validate_vlans(f_module, spec, vlan_name_id_map)
+        assert exc.value.fail_msg == msg
+
+    def test_validate_ports_repeated_nic(self):
+        f_module = self.get_module_mock()
+        with pytest.raises(AnsibleFailJSonException) as exc:
+            self.module.validate_ports(f_module, [{"template_id": 12, "nic_identifier": "NIC Slot 4"},
+                                                  {"template_id": 13, "nic_identifier": "NIC Slot 4"},
+                                                  {"template_id": 12, "nic_identifier": "NIC Slot 4"}])
+        assert exc.value.fail_msg == "nic_identifier 'NIC Slot 4' repeated for the template with template_id 12"
+
+    def test_validate_vlans_ids_only(self):
+        f_module = self.get_module_mock()
+        spec = {"tagged_networks": [{"port": 1, "tagged_network_ids": [7, 8]}],
+                "untagged_networks": [{"port": 1, "untagged_network_id": 9}, {"port": 2, "untagged_network_name": "0"}]}
+        untag_dict, tagged_dict = self.module.validate_vlans(f_module, spec, None)
+        assert untag_dict == {1: 9, 2: 0}
+        assert tagged_dict == {1: [7, 8]}
+
+    def test_validate_vlans_tagged_order(self):
+        f_module = self.get_module_mock()
+        spec = {"tagged_networks": [{"port": 1, "tagged_network_ids": [4, 1, 4], "tagged_network_names": ["vlan2", "vlan1"]}]}
+        untag_dict, tagged_dict = self.module.validate_vlans(f_module, spec, {"vlan1": 1, "vlan2": 2, "gold": 4})
+        assert tagged_dict == {1: [4, 1, 2]}
+
+    @pytest.mark.parametrize("tagged_dict, port_tagged_map, equal", [
+        ({1: [12767, 12765]}, {1: [12765, 12767], 2: [12766]}, True),
+        ({1: [12765, 12767, 12768]}, {1: [12765, 12767]}, False),
+        ({1: []}, {1: []}, True),
+        ({1: [12765]}, {}, False),
+        ({1: [12765]}, {1: 12765}, False),
+        ({"IscsiSettings": None}, {"IscsiSettings": None, "FcSettings": None}, True),
+        ({"IscsiSettings": {"Mac": 1}}, {"IscsiSettings": None}, False)])
+    def test_compare_nested_dict_vlan_lists(self, tagged_dict, port_tagged_map, equal):
+        assert self.module.compare_nested_dict(tagged_dict, port_tagged_map) is equal
+
     @pytest.mark.parametrize("modify_setting_payload", [{"Description": "Identity pool with ethernet and fcoe settings2"}, {"Name": "pool2"}, {"EthernetSettings":{"Mac":{"IdentityCount":61,"StartingMacAddress":"UFBQUFAA"}}},
                                                         {"Description": "Identity pool with ethernet and fcoe settings2", "EthernetSettings": {"Mac": {"IdentityCount": 60, "StartingMacAddress": "UFBQUFAA"}},
                                                          "FcoeSettings": {"Mac": {"IdentityCount": 70, "StartingMacAddress": "cHBwcHAA"}}}])
@@ -18,6 +18,8 @@ from ansible.module_utils.six.moves.urllib.error import URLError, HTTPError
 from ansible.module_utils.remote_management.dellemc.ome import RestOME
 from units.compat.mock import MagicMock
 import json
+import gzip
+import io
 
 
 class TestRestOME(object):
@@ -53,6 +55,61 @@ class TestRestOME(object):
         assert response.json_data == {"value": "data"}
         assert response.success is True
 
+    def test_invoke_request_gzip_response(self, mock_response, mocker):
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode="wb") as gzip_file:
+            gzip_file.write(json.dumps({"value": "data"}).encode())
+        mock_response.read.return_value = compressed.getvalue()
+        mock_response.headers = {'Content-Encoding': 'gzip'}
+        open_url_mock = mocker.patch('ansible.module_utils.remote_management.dellemc.ome.open_url',
+                                     return_value=mock_response)
+        module_params = {'hostname': '192.168.0.1', 'username': 'username',
+                         'password': 'password', "port": 443}
+        with RestOME(module_params, False) as obj:
+            response = obj.invoke_request("GET", "/testpath")
+        assert open_url_mock.call_args[1]["headers"]["Accept-Encoding"] == "gzip"
+        assert response.json_data == {"value": "data"}
+
+    def test_invoke_request_gzip_http_error(self, mocker):
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode="wb") as gzip_file:
+            gzip_file.write(json.dumps({"error": "details"}).encode())
+        open_url_mock = mocker.patch('ansible.module_utils.remote_management.dellemc.ome.open_url')
+        open_url_mock.side_effect = HTTPError('http://testhost.com/', 400, 'Bad Request Error',
+                                              {'Content-Encoding': 'gzip'}, io.BytesIO(compressed.getvalue()))
+        module_params = {'hostname': '192.168.0.1', 'username': 'username',
+                         'password': 'password', "port": 443}
+        with pytest.raises(HTTPError) as e:
+            with RestOME(module_params, False) as obj:
+                obj.invoke_request("GET", "/testpath")
+        assert e.value.code == 400
+        assert json.load(e.value) == {"error": "details"}
+
+    def test_json_data_decoded_once(self, mock_response, mocker):
+        mocker.patch('ansible.module_utils.remote_management.dellemc.ome.open_url',
+                     return_value=mock_response)
+        loads_mock = mocker.patch('ansible.module_utils.remote_management.dellemc.ome.json.loads',
+                                  return_value={"value": "data"})
+        module_params = {'hostname': '192.168.0.1', 'username': 'username',
+                         'password': 'password', "port": 443}
+        with RestOME(module_params, False) as obj:
+            response = obj.invoke_request("GET", "/testpath")
+            assert response.json_data == {"value": "data"}
+            assert response.json_data is response.json_data
+        assert loads_mock.call_count == 1
+
+    def test_invoke_request_headers_not_persisted(self, mock_response, mocker):
+        open_url_mock = mocker.patch('ansible.module_utils.remote_management.dellemc.ome.open_url',
+                                     return_value=mock_response)
+        module_params = {'hostname': '192.168.0.1', 'username': 'username',
+                         'password': 'password', "port": 443}
+        with RestOME(module_params, False) as obj:
+            response = obj.invoke_request("GET", "/testpath", headers={"If-None-Match": "etag"})
+            assert open_url_mock.call_args[1]["headers"]["If-None-Match"] == "etag"
+            obj.invoke_request("GET", "/testpath")
+            assert "If-None-Match" not in open_url_mock.call_args[1]["headers"]
+        assert response.headers == {'X-Auth-Token': 'token_id'}
+
     @pytest.mark.parametrize("exc", [URLError, SSLValidationError, ConnectionError])
     def test_invoke_request_error_case_handling(self, exc, mock_response, mocker):
         open_url_mock = mocker.patch('ansible.module_utils.remote_management.dellemc.ome.open_url',
@@ -28,31 +28,53 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import json
+import zlib
+from io import BytesIO
 from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
 from ansible.module_utils.six.moves.urllib.error import URLError, HTTPError
 from ansible.module_utils.six.moves.urllib.parse import urlencode
 
+GZIP_MAGIC = b'\x1f\x8b'
+
 SESSION_RESOURCE_COLLECTION = {
     "SESSION": "SessionService/Sessions",
     "SESSION_ID": "SessionService/Sessions('{Id}')",
 }
 
 
+def decompress_body(body, headers):
+    """returns the body inflated when the server gzip encoded it"""
+    if body and body[:2] == GZIP_MAGIC and (headers.get('Content-Encoding') or '').lower() == 'gzip':
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    return body
+
+
+def decompress_http_error(err):
+    """HTTPError with a readable error body, callers load it with json.load(err)"""
+    if err.fp is None or not err.hdrs or (err.hdrs.get('Content-Encoding') or '').lower() != 'gzip':
+        return err
+    return HTTPError(err.url, err.code, err.msg, err.hdrs, BytesIO(decompress_body(err.read(), err.hdrs)))
+
+
 class OpenURLResponse(object):
     """Handles HTTPResponse"""
 
     def __init__(self, resp):
         self.body = None
         self.resp = resp
+        self._json_data = None
         if self.resp:
-            self.body = self.resp.read()
+            self.body = decompress_body(self.resp.read(), self.resp.headers)
 
     @property
     def json_data(self):
-        try:
-            return json.loads(self.body)
-        except ValueError:
-            raise ValueError("Unable to parse json")
+        """body decoded once and reused on later access"""
+        if self._json_data is None:
+            try:
+                self._json_data = json.loads(self.body)
+            except ValueError:
+                raise ValueError("Unable to parse json")
+        return self._json_data
 
     @property
     def status_code(self):
@@ -66,6 +88,10 @@ class OpenURLResponse(object):
     def token_header(self):
         return self.resp.headers.get('X-Auth-Token')
 
+    @property
+    def headers(self):
+        return self.resp.headers
+
 
 class RestOME(object):
     """Handles OME API requests"""
@@ -79,7 +105,8 @@ class RestOME(object):
         self.req_session = req_session
         self.session_id = None
         self.protocol = 'https'
-        self._headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        self._headers = {'Content-Type': 'application/json', 'Accept': 'application/json',
+                         'Accept-Encoding': 'gzip'}
 
     def _get_base_url(self):
         """builds base url"""
@@ -97,7 +124,7 @@ class RestOME(object):
 
     def _url_common_args_spec(self, method, api_timeout, headers=None):
         """Creates an argument common spec"""
-        req_header = self._headers
+        req_header = dict(self._headers)
         if headers:
             req_header.update(headers)
         url_kwargs = {
@@ -112,9 +139,6 @@ class RestOME(object):
 
     def _args_without_session(self, method, api_timeout=30, headers=None):
         """Creates an argument spec in case of basic authentication"""
-        req_header = self._headers
-        if headers:
-            req_header.update(headers)
         url_kwargs = self._url_common_args_spec(method, api_timeout, headers=headers)
         url_kwargs["url_username"] = self.username
         url_kwargs["url_password"] = self.password
@@ -153,7 +177,9 @@ class RestOME(object):
             url = self._build_url(path, query_param=query_param)
             resp = open_url(url, data=data, **url_kwargs)
             resp_data = OpenURLResponse(resp)
-        except (HTTPError, URLError, SSLValidationError, ConnectionError) as err:
+        except HTTPError as err:
+            raise decompress_http_error(err)
+        except (URLError, SSLValidationError, ConnectionError) as err:
             raise err
         return resp_data
 